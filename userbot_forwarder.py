@@ -5,13 +5,16 @@ import re
 import signal
 import sys
 import argparse
+import heapq
 import yaml
 from telethon import TelegramClient, events
-from telethon.errors import SessionPasswordNeededError, PhoneCodeInvalidError, PhoneNumberInvalidError
+from telethon.errors import SessionPasswordNeededError, PhoneCodeInvalidError, PhoneNumberInvalidError, FloodWaitError
 from typing import Optional
 import time
 import json
+import sqlite3
 from datetime import datetime, date
+from collections import Counter, OrderedDict, namedtuple
 
 # Configure logging
 logging.basicConfig(
@@ -24,6 +27,24 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Telethon uses cryptg automatically when installed; its native AES-IGE is far faster than the pure-Python fallback
+try:
+    import cryptg  # noqa: F401
+except ImportError:
+    logger.warning("Install cryptg for ~10x faster MTProto encryption: pip install cryptg")
+
+# orjson is much faster at decoding the legacy JSON tracking files; fall back to the stdlib if it isn't installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+def json_loads(raw: bytes):
+    """Deserialize JSON bytes"""
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
 # --- Configuration for Userbot ---
 def load_config():
     """Load configuration from YAML file"""
@@ -47,8 +68,78 @@ BOT_USERNAME = config.get('TELEGRAM_BOT_USERNAME', 'AfterhoursFWL_Bot')
 DUPLICATE_IGNORE_DURATION = int(config.get('DUPLICATE_IGNORE_DURATION', '3600'))  # Default: 1 hour in seconds
 DUPLICATE_CHECK_ENABLED = config.get('DUPLICATE_CHECK_ENABLED', 'true').lower() == 'true'
 
+# How long tracking changes are batched before being flushed to disk (in seconds)
+TRACKING_FLUSH_INTERVAL = 5
+
+# One row per user: latest tracking status (kind/ts/reason, kind is NULL once expired) and last forward (forwarded/day)
+TRACKING_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracking (
+    user_id INTEGER PRIMARY KEY,
+    kind TEXT,
+    name TEXT,
+    ts REAL,
+    reason TEXT,
+    forwarded REAL,
+    day INTEGER
+);
+DROP INDEX IF EXISTS idx_ts;
+CREATE INDEX IF NOT EXISTS idx_kind_ts ON tracking(kind, ts);
+CREATE INDEX IF NOT EXISTS idx_day_forwarded ON tracking(day, forwarded);
+"""
+
+# Maximum number of resolved entities kept in memory
+ENTITY_CACHE_SIZE = 32
+
+# Outbound forwards are batched into as few bot messages as possible to stay clear of flood limits
+MAX_MESSAGE_LENGTH = 4096  # Telegram's limit for a single message, in UTF-16 code units
+FORWARD_BATCH_DELAY = 1.0  # seconds to wait for more forwards before sending a batch
+FORWARD_SEPARATOR = '\n---\n'
+
+# Telegram splits long pastes into several messages; a message at least this long is held briefly to collect the rest
+LONG_MESSAGE_THRESHOLD = 4000  # in UTF-16 code units, like MAX_MESSAGE_LENGTH
+CONTINUATION_WINDOW = 2.0  # seconds to wait for the next part, restarted on each part
+MAX_HOLD_DURATION = 10.0  # seconds a long message is held at most, however many parts keep arriving
+MAX_HOLD_PARTS = 10  # parts collected at most before the message is forwarded
+
+def message_length(text: str) -> int:
+    """Length of text as Telegram counts it (UTF-16 code units, so emoji outside the BMP count twice)"""
+    return len(text.encode('utf-16-le')) // 2
+
+def split_message(text: str) -> list:
+    """Split text into parts that each fit within MAX_MESSAGE_LENGTH"""
+    parts = []
+    start = 0
+    length = 0
+    for i, char in enumerate(text):
+        width = 2 if ord(char) > 0xFFFF else 1
+        if length + width > MAX_MESSAGE_LENGTH:
+            parts.append(text[start:i])
+            start = i
+            length = 0
+        length += width
+    parts.append(text[start:])
+    return parts
+
+# Matches the 3-4 digit numbers used to recognise senders worth forwarding
+_DIGIT_RE = re.compile(r'\d{3,4}')
+
+# Directory containing this script; session and tracking files live next to it
+_HERE = os.path.dirname(os.path.abspath(__file__))
+
 SESSION_NAME = 'driver_forwarding_session'
-SESSION_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), f'{SESSION_NAME}.session')
+SESSION_PATH = os.path.join(_HERE, f'{SESSION_NAME}.session')
+
+# Per-user tracking state: latest tracking status ('ignored'/'collected' or None once expired)
+# with its expiry time (monotonic clock), plus the ordinal of the day a message was last forwarded (0 if never)
+_Entry = namedtuple('_Entry', 'status expiry day name reason forwarded')
+
+# Tracking statuses; interned so status comparisons and counter lookups hit the identity fast path,
+# including for values read back from the database
+K_IGNORED = sys.intern('ignored')
+K_COLLECTED = sys.intern('collected')
+
+# Clock for expiry bookkeeping; unlike time.time() it never jumps on NTP or manual clock adjustments
+_now = time.monotonic
 
 # Global variables for graceful shutdown
 client = None
@@ -58,28 +149,61 @@ class UserbotForwarder:
     def __init__(self):
         self.client = TelegramClient(SESSION_NAME, API_ID, API_HASH)
         self.bot_entity = None
+        # Resolved entities by username, most recently used last
+        self._entity_cache = OrderedDict()
         self.retry_count = 0
         self.max_retries = 5
         self.retry_delay = 30  # seconds
         
-        # Daily message tracking
-        self.daily_messages_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'daily_messages.json')
-        self.forwarded_today = self.load_daily_messages()
+        # Tracking database for duplicate handling and daily limits
+        self.tracking_db_file = os.path.join(_HERE, 'tracking.db')
+        is_new_db = not os.path.exists(self.tracking_db_file)
+        self._db = self._open_tracking_db()
+        
+        # JSON files used by older versions, imported once when the database is first created
+        self.daily_messages_file = os.path.join(_HERE, 'daily_messages.json')
+        self.message_tracking_file = os.path.join(_HERE, 'message_tracking.json')
+        
+        # Offset to convert monotonic expiry times to wall-clock timestamps for the tracking database
+        self._mono_to_wall = time.time() - _now()
+        
+        # Cached ordinal of the current day, refreshed by the periodic cleanup task
+        self._today_ordinal = date.today().toordinal()
+        
+        # Single per-user state (keyed by int user ID) covering both duplicate tracking and daily limits
+        self._state = {}
+        # Number of entries per tracking status ('ignored'/'collected') that have not expired yet
+        self._status_counts = Counter()
+        # Min-heap of (expiry, user_id, is_midnight) so expired entries can be popped without a full scan
+        self._expiry_heap = []
+        
+        # Tracking changes are kept in memory and the changed users flushed to disk in the background
+        self._dirty_users = set()
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task = None
+        
+        self.load_tracking_state(import_legacy=is_new_db)
+        if self._dirty_users:
+            self._flush_requested.set()
+        
+        # Formatted forwards waiting to be batched and sent to the bot
+        self._out_queue = asyncio.Queue()
+        self._sender_task = None
         
-        # Message tracking for duplicate handling
-        self.message_tracking_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'message_tracking.json')
-        self.message_tracking = self.load_message_tracking()
+        # Long messages waiting for continuation parts: sender_id -> (message, sender_name, parts, window task, held since)
+        self._pending = {}
         
         # Clean up old tracking data on startup
         self.cleanup_old_tracking_data()
         
     def load_daily_messages(self) -> dict:
-        """Load today's forwarded messages from file"""
-        today = str(date.today())
+        """Load today's forwarded messages from the legacy JSON file"""
+        today = str(date.fromordinal(self._today_ordinal))
         try:
             if os.path.exists(self.daily_messages_file):
-                with open(self.daily_messages_file, 'r') as f:
-                    data = json.load(f)
+                with open(self.daily_messages_file, 'rb') as f:
+                    data = json_loads(f.read())
                     # Return today's data, or empty dict if it's a new day
                     if data.get('date') == today:
                         return data.get('forwarded_users', {})
@@ -91,139 +215,271 @@ class UserbotForwarder:
             logger.error(f"Error loading daily messages file: {e}")
             return {}
     
-    def save_daily_messages(self):
-        """Save today's forwarded messages to file"""
-        today = str(date.today())
-        data = {
-            'date': today,
-            'forwarded_users': self.forwarded_today
-        }
-        try:
-            with open(self.daily_messages_file, 'w') as f:
-                json.dump(data, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving daily messages file: {e}")
-    
     def load_message_tracking(self) -> dict:
-        """Load message tracking data from file"""
+        """Load message tracking data from the legacy JSON file"""
         try:
             if os.path.exists(self.message_tracking_file):
-                with open(self.message_tracking_file, 'r') as f:
-                    data = json.load(f)
+                with open(self.message_tracking_file, 'rb') as f:
+                    data = json_loads(f.read())
                     return data
-            return {'ignored': {}, 'collected': {}}
+            return {K_IGNORED: {}, K_COLLECTED: {}}
         except Exception as e:
             logger.error(f"Error loading message tracking file: {e}")
-            return {'ignored': {}, 'collected': {}}
+            return {K_IGNORED: {}, K_COLLECTED: {}}
     
-    def save_message_tracking(self):
-        """Save message tracking data to file"""
-        try:
-            with open(self.message_tracking_file, 'w') as f:
-                json.dump(self.message_tracking, f, indent=2)
-        except Exception as e:
-            logger.error(f"Error saving message tracking file: {e}")
+    def import_legacy_tracking(self):
+        """Import the JSON tracking files written by older versions into the in-memory state"""
+        # Keep the most recent status per user if they appear in both sections
+        for status, entries in self.load_message_tracking().items():
+            status = sys.intern(status)
+            for user_id, data in entries.items():
+                user_id = int(user_id)
+                expiry = data.get('timestamp', 0) + DUPLICATE_IGNORE_DURATION - self._mono_to_wall
+                current = self._state.get(user_id)
+                if current is None or expiry > current.expiry:
+                    self._state[user_id] = _Entry(status, expiry, 0, data.get('name', 'Unknown'), data.get('reason'), 0.0)
+        
+        today_ordinal = self._today_ordinal
+        for user_id, data in self.load_daily_messages().items():
+            user_id = int(user_id)
+            forwarded = data.get('timestamp')
+            if forwarded is None:
+                # Files written by older versions only stored a formatted time
+                try:
+                    forwarded = datetime.strptime(data.get('time', ''), '%Y-%m-%d %H:%M:%S').timestamp()
+                except ValueError:
+                    forwarded = time.time()
+            current = self._state.get(user_id)
+            if current is None:
+                self._state[user_id] = _Entry(None, 0.0, today_ordinal, data.get('name', 'Unknown'), None, forwarded)
+            else:
+                self._state[user_id] = current._replace(day=today_ordinal, forwarded=forwarded)
+        
+        if self._state:
+            logger.info(f"Imported {len(self._state)} entries from the JSON tracking files into {self.tracking_db_file}")
+            self._dirty_users.update(self._state)
     
-    def cleanup_old_tracking_data(self):
-        """Remove tracking data older than the ignore duration"""
-        if not DUPLICATE_CHECK_ENABLED:
-            return
-            
-        current_time = time.time()
-        cutoff_time = current_time - DUPLICATE_IGNORE_DURATION
+    def _open_tracking_db(self) -> sqlite3.Connection:
+        """Open the tracking database, creating the schema if needed"""
+        # Writes happen on executor threads, serialized by the flush lock
+        conn = sqlite3.connect(self.tracking_db_file, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.executescript(TRACKING_SCHEMA)
+        return conn
+    
+    def close(self):
+        """Close the tracking database"""
+        self._db.close()
+    
+    def load_tracking_state(self, import_legacy: bool = False):
+        """Build the in-memory per-user state from the tracking database"""
+        today_ordinal = self._today_ordinal
+        
+        # Rows whose status has expired and that weren't forwarded today no longer matter
+        cutoff_time = time.time() - DUPLICATE_IGNORE_DURATION
+        with self._db:
+            self._db.execute('DELETE FROM tracking WHERE (kind IS NULL OR ts <= ?) AND day != ?', (cutoff_time, today_ordinal))
+        
+        # Both kinds come back in one pass and share a single wall-to-monotonic offset
+        expiry_offset = DUPLICATE_IGNORE_DURATION - self._mono_to_wall
+        rows = self._db.execute('SELECT user_id, kind, name, ts, reason, forwarded, day FROM tracking')
+        self._state = {
+            user_id: _Entry(kind and sys.intern(kind), 0.0 if ts is None else ts + expiry_offset, day, name, reason, forwarded)
+            for user_id, kind, name, ts, reason, forwarded, day in rows
+        }
+        
+        if import_legacy:
+            self.import_legacy_tracking()
         
-        # Clean ignored messages
-        cleaned_ignored = {}
-        for user_id, data in self.message_tracking['ignored'].items():
-            if data.get('timestamp', 0) > cutoff_time:
-                cleaned_ignored[user_id] = data
+        next_midnight = self._next_midnight()
+        for user_id, entry in self._state.items():
+            if entry.status is not None:
+                self._status_counts[entry.status] += 1
+                self._expiry_heap.append((entry.expiry, user_id, False))
+            if entry.day == today_ordinal:
+                self._expiry_heap.append((next_midnight, user_id, True))
+        heapq.heapify(self._expiry_heap)
+    
+    def _mark_dirty(self, user_id: int):
+        """Flag a user's in-memory state for the background writer"""
+        self._dirty_users.add(user_id)
+        self._flush_requested.set()
+    
+    def _write_tracking_rows(self, upserts: list, deletes: list):
+        """Apply pending row changes to the tracking database in a single transaction"""
+        with self._db:
+            self._db.executemany(
+                'INSERT OR REPLACE INTO tracking (user_id, kind, name, ts, reason, forwarded, day) VALUES (?, ?, ?, ?, ?, ?, ?)',
+                upserts
+            )
+            self._db.executemany('DELETE FROM tracking WHERE user_id = ?', deletes)
+    
+    async def flush_tracking_data(self):
+        """Write any pending tracking changes to disk"""
+        # The lock keeps the background writer and the shutdown flush from writing at the same time
+        async with self._flush_lock:
+            if not self._dirty_users:
+                return
+            
+            # Snapshot on the event loop so the writer thread never sees the state mid-update
+            dirty_users, self._dirty_users = self._dirty_users, set()
+            upserts = []
+            deletes = []
+            for user_id in dirty_users:
+                entry = self._state.get(user_id)
+                if entry is None:
+                    deletes.append((user_id,))
+                    continue
+                ts = None if entry.status is None else entry.expiry - DUPLICATE_IGNORE_DURATION + self._mono_to_wall
+                upserts.append((user_id, entry.status, entry.name, ts, entry.reason, entry.forwarded, entry.day))
+            
+            try:
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, self._write_tracking_rows, upserts, deletes)
+            except Exception as e:
+                self._dirty_users |= dirty_users
+                self._flush_requested.set()
+                logger.error(f"Error saving tracking database: {e}")
+    
+    async def _flusher(self):
+        """Write tracking changes to disk in the background, coalescing bursts into a single write"""
+        while not shutdown_event.is_set():
+            try:
+                await self._flush_requested.wait()
+                # Let a burst of messages accumulate before writing
+                await asyncio.sleep(TRACKING_FLUSH_INTERVAL)
+                self._flush_requested.clear()
+                await self.flush_tracking_data()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in periodic flush: {e}")
+    
+    def refresh_today(self):
+        """Update the cached day ordinal, resetting daily limits when the date changes"""
+        today_ordinal = date.today().toordinal()
+        if today_ordinal != self._today_ordinal:
+            self._today_ordinal = today_ordinal
+            logger.info("New day detected. Resetting forwarded messages tracking.")
+    
+    def _next_midnight(self) -> float:
+        """Monotonic time at which today's daily limits stop applying"""
+        tomorrow = date.fromordinal(self._today_ordinal + 1)
+        return datetime.combine(tomorrow, datetime.min.time()).timestamp() - self._mono_to_wall
+    
+    def expire_tracking_data(self) -> int:
+        """Pop expired entries off the expiry heap and update the per-user state. Returns the number of expired statuses."""
+        self.refresh_today()
+        current_time = _now()
+        today_ordinal = self._today_ordinal
+        expired = 0
         
-        # Clean collected messages
-        cleaned_collected = {}
-        for user_id, data in self.message_tracking['collected'].items():
-            if data.get('timestamp', 0) > cutoff_time:
-                cleaned_collected[user_id] = data
+        # Bind attributes used on every iteration; after midnight this loop pops one item per user forwarded the day before
+        heap = self._expiry_heap
+        state = self._state
+        status_counts = self._status_counts
+        heappop = heapq.heappop
+        heappush = heapq.heappush
+        mark_dirty = self._mark_dirty
         
-        self.message_tracking['ignored'] = cleaned_ignored
-        self.message_tracking['collected'] = cleaned_collected
-        self.save_message_tracking()
+        while heap and heap[0][0] <= current_time:
+            expiry, user_id, is_midnight = heappop(heap)
+            entry = state.get(user_id)
+            if entry is None:
+                continue
+            
+            if is_midnight:
+                # The wall clock hasn't reached the new day yet (clock adjustment), so check again later
+                if entry.day == today_ordinal:
+                    heappush(heap, (max(self._next_midnight(), current_time + 60), user_id, True))
+                    continue
+            elif entry.status is not None:
+                # Entries tracked again since this item was pushed have a newer heap item, so skip them
+                if entry.expiry != expiry:
+                    continue
+                status_counts[entry.status] -= 1
+                entry = entry._replace(status=None, reason=None)
+                expired += 1
+                mark_dirty(user_id)
+            
+            # Users forwarded today stay around for the daily limit; mark_as_forwarded scheduled their removal at midnight
+            if entry.status is not None or entry.day == today_ordinal:
+                state[user_id] = entry
+            else:
+                del state[user_id]
+                mark_dirty(user_id)
         
-        logger.info(f"Cleaned up tracking data. Kept {len(cleaned_ignored)} ignored and {len(cleaned_collected)} collected entries.")
+        return expired
     
-    def has_forwarded_today(self, user_id: int) -> bool:
-        """Check if we've already forwarded a message from this user today"""
-        return str(user_id) in self.forwarded_today
+    def cleanup_old_tracking_data(self):
+        """Remove tracking data older than the ignore duration"""
+        # Always expire, so users forwarded on previous days are dropped even with tracking disabled
+        removed = self.expire_tracking_data()
+        
+        if not DUPLICATE_CHECK_ENABLED:
+            return
+        
+        logger.info(f"Cleaned up tracking data. Removed {removed} expired entries, kept {self._status_counts[K_IGNORED]} ignored and {self._status_counts[K_COLLECTED]} collected entries.")
     
     def mark_as_forwarded(self, user_id: int, sender_name: str):
         """Mark this user as having a message forwarded today"""
-        self.forwarded_today[str(user_id)] = {
-            'name': sender_name,
-            'time': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        self.save_daily_messages()
+        current_time = time.time()
+        today_ordinal = self._today_ordinal
+        entry = self._state.get(user_id)
+        if entry is None:
+            self._state[user_id] = _Entry(None, 0.0, today_ordinal, sender_name, None, current_time)
+        else:
+            self._state[user_id] = entry._replace(day=today_ordinal, name=sender_name, forwarded=current_time)
+        heapq.heappush(self._expiry_heap, (self._next_midnight(), user_id, True))
+        self._mark_dirty(user_id)
+    
+    def unmark_as_forwarded(self, user_id: int):
+        """Release today's forwarding slot for this user, e.g. when forwarding failed"""
+        entry = self._state.get(user_id)
+        if entry is not None and entry.day == self._today_ordinal:
+            self._state[user_id] = entry._replace(day=0)
+            self._mark_dirty(user_id)
+    
+    def _set_status(self, user_id: int, sender_name: str, status: str, reason: Optional[str]):
+        """Record the latest tracking status for a user and schedule its expiry"""
+        expiry = _now() + DUPLICATE_IGNORE_DURATION
+        entry = self._state.get(user_id)
+        if entry is None:
+            self._state[user_id] = _Entry(status, expiry, 0, sender_name, reason, 0.0)
+        else:
+            if entry.status is not None:
+                self._status_counts[entry.status] -= 1
+            self._state[user_id] = entry._replace(status=status, expiry=expiry, name=sender_name, reason=reason)
+        self._status_counts[status] += 1
+        heapq.heappush(self._expiry_heap, (expiry, user_id, False))
+        self._mark_dirty(user_id)
         
     def track_ignored_message(self, user_id: int, sender_name: str, reason: str):
         """Track a message that was ignored"""
         if not DUPLICATE_CHECK_ENABLED:
             return
-            
-        current_time = time.time()
-        self.message_tracking['ignored'][str(user_id)] = {
-            'name': sender_name,
-            'timestamp': current_time,
-            'reason': reason,
-            'time_formatted': datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S')
-        }
-        self.save_message_tracking()
+        
+        self._set_status(user_id, sender_name, K_IGNORED, reason)
         logger.info(f"Tracked ignored message from {sender_name} (ID: {user_id}) - Reason: {reason}")
     
     def track_collected_message(self, user_id: int, sender_name: str):
         """Track a message that was collected/forwarded"""
         if not DUPLICATE_CHECK_ENABLED:
             return
-            
-        current_time = time.time()
-        self.message_tracking['collected'][str(user_id)] = {
-            'name': sender_name,
-            'timestamp': current_time,
-            'time_formatted': datetime.fromtimestamp(current_time).strftime('%Y-%m-%d %H:%M:%S')
-        }
-        self.save_message_tracking()
+        
+        self._set_status(user_id, sender_name, K_COLLECTED, None)
         logger.info(f"Tracked collected message from {sender_name} (ID: {user_id})")
     
-    def is_message_recently_handled(self, user_id: int) -> bool:
-        """Check if a message from this user was recently handled (within ignore duration)"""
-        if not DUPLICATE_CHECK_ENABLED:
-            return False
-            
-        current_time = time.time()
-        cutoff_time = current_time - DUPLICATE_IGNORE_DURATION
-        
-        # Check ignored messages
-        if str(user_id) in self.message_tracking['ignored']:
-            if self.message_tracking['ignored'][str(user_id)].get('timestamp', 0) > cutoff_time:
-                return True
-        
-        # Check collected messages
-        if str(user_id) in self.message_tracking['collected']:
-            if self.message_tracking['collected'][str(user_id)].get('timestamp', 0) > cutoff_time:
-                return True
-        
-        return False
-        
     def get_tracking_stats(self) -> dict:
         """Get current tracking statistics"""
         if not DUPLICATE_CHECK_ENABLED:
             return {'enabled': False}
             
-        current_time = time.time()
-        cutoff_time = current_time - DUPLICATE_IGNORE_DURATION
-        
-        # Count recent entries
-        recent_ignored = sum(1 for data in self.message_tracking['ignored'].values() 
-                           if data.get('timestamp', 0) > cutoff_time)
-        recent_collected = sum(1 for data in self.message_tracking['collected'].values() 
-                             if data.get('timestamp', 0) > cutoff_time)
+        # Once expired entries are popped, the live counters are exact
+        self.expire_tracking_data()
+        recent_ignored = self._status_counts[K_IGNORED]
+        recent_collected = self._status_counts[K_COLLECTED]
         
         return {
             'enabled': True,
@@ -231,8 +487,8 @@ class UserbotForwarder:
             'ignore_duration_hours': DUPLICATE_IGNORE_DURATION / 3600,
             'recent_ignored': recent_ignored,
             'recent_collected': recent_collected,
-            'total_ignored': len(self.message_tracking['ignored']),
-            'total_collected': len(self.message_tracking['collected']),
+            'total_ignored': recent_ignored,
+            'total_collected': recent_collected,
             'last_cleanup': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
     
@@ -255,17 +511,16 @@ class UserbotForwarder:
         
     async def start_periodic_cleanup(self):
         """Start periodic cleanup of old tracking data"""
-        if not DUPLICATE_CHECK_ENABLED:
-            return
-            
         async def cleanup_task():
             while not shutdown_event.is_set():
                 try:
-                    # Wait for the cleanup interval (half of ignore duration)
+                    # Wait for the cleanup interval (half of ignore duration), waking at midnight so daily limits reset on time
                     cleanup_interval = max(DUPLICATE_IGNORE_DURATION // 2, 300)  # At least 5 minutes
-                    await asyncio.sleep(cleanup_interval)
+                    until_midnight = max(self._next_midnight() - _now(), 1)
+                    await asyncio.sleep(min(cleanup_interval, until_midnight))
                     
                     if not shutdown_event.is_set():
+                        self.refresh_today()
                         self.cleanup_old_tracking_data()
                         
                 except asyncio.CancelledError:
@@ -278,6 +533,19 @@ class UserbotForwarder:
         asyncio.create_task(cleanup_task())
         logger.info(f"Started periodic cleanup task (every {max(DUPLICATE_IGNORE_DURATION // 2, 300)} seconds)")
         
+    async def _resolve(self, username: str):
+        """Resolve an entity by username, serving repeat lookups from an in-memory LRU cache"""
+        entity = self._entity_cache.get(username)
+        if entity is not None:
+            self._entity_cache.move_to_end(username)
+            return entity
+        
+        entity = await self.client.get_entity(username)
+        self._entity_cache[username] = entity
+        if len(self._entity_cache) > ENTITY_CACHE_SIZE:
+            self._entity_cache.popitem(last=False)
+        return entity
+    
     async def setup_client(self):
         """Initialize and authenticate the Telegram client"""
         try:
@@ -285,11 +553,15 @@ class UserbotForwarder:
             await self.client.start()
             
             # Get bot entity once and cache it
-            self.bot_entity = await self.client.get_entity(BOT_USERNAME)
+            self.bot_entity = await self._resolve(BOT_USERNAME)
             logger.info(f"Successfully connected to bot: {BOT_USERNAME}")
             
-            # Register event handler for private messages
-            self.client.add_event_handler(self.handle_new_message, events.NewMessage(incoming=True, func=lambda e: e.is_private))
+            # Register event handler for private text messages; stickers, media without captions etc. are filtered out
+            # by Telethon before the handler is even scheduled
+            self.client.add_event_handler(
+                self.handle_new_message,
+                events.NewMessage(incoming=True, func=lambda e: e.is_private and bool(e.message.text))
+            )
             logger.info("Event handler registered successfully")
             
             # Display tracking configuration
@@ -298,6 +570,14 @@ class UserbotForwarder:
             # Start periodic cleanup task
             await self.start_periodic_cleanup()
             
+            # Start background flushing of tracking data
+            if self._flush_task is None or self._flush_task.done():
+                self._flush_task = asyncio.create_task(self._flusher())
+            
+            # Start the outbound sender for forwarded messages
+            if self._sender_task is None or self._sender_task.done():
+                self._sender_task = asyncio.create_task(self._sender())
+            
             return True
             
         except SessionPasswordNeededError:
@@ -314,111 +594,238 @@ class UserbotForwarder:
         """Handle new incoming private messages and forward them to the bot"""
         try:
             message = event.message
-            sender = await message.get_sender()
+            sender_id = event.sender_id
             
-            if not sender:
-                logger.warning("Could not get sender information")
+            # Further parts of a long message that is still being collected
+            pending = self._pending.get(sender_id)
+            if pending is not None:
+                first_message, sender_name, parts, window_task, held_since = pending
+                window_task.cancel()
+                parts.append(message.text)
+                
+                # Don't let a sender who keeps writing hold the forward back indefinitely
+                if len(parts) >= MAX_HOLD_PARTS or _now() - held_since >= MAX_HOLD_DURATION:
+                    del self._pending[sender_id]
+                    await self.process_first_message(first_message, sender_name, sender_id, '\n'.join(parts))
+                else:
+                    self._hold_long_message(first_message, sender_name, sender_id, parts, held_since)
                 return
             
-            # Build sender name
-            sender_name = self.build_sender_name(sender)
-            sender_id = sender.id
+            # Cheap duplicate checks first: one state lookup covers both the recent-duplicate and the daily-limit checks,
+            # and the stored name is enough for logging, so repeat senders never need their entity or name resolved
+            entry = self._state.get(sender_id)
+            if entry is not None:
+                # Check if we've already handled a message from this user recently (within ignore duration)
+                if DUPLICATE_CHECK_ENABLED and entry.expiry > _now():
+                    logger.info(f"Already handled a message from '{entry.name}' (ID: {sender_id}) recently. Skipping.")
+                    return
+                
+                # Check if we've already forwarded a message from this user today
+                if entry.day == self._today_ordinal:
+                    logger.info(f"Already forwarded a message from '{entry.name}' (ID: {sender_id}) today. Skipping.")
+                    self.track_ignored_message(sender_id, entry.name, "Already forwarded today")
+                    return
             
-            # Check if we've already handled a message from this user recently (within ignore duration)
-            if self.is_message_recently_handled(sender_id):
-                logger.info(f"Already handled a message from '{sender_name}' (ID: {sender_id}) recently. Skipping.")
-                return
+            # event.sender is already populated for cached peers; only fall back to an RPC for unknown ones
+            sender = event.sender or await event.get_sender()
             
-            # Check if we've already forwarded a message from this user today
-            if self.has_forwarded_today(sender_id):
-                logger.info(f"Already forwarded a message from '{sender_name}' (ID: {sender_id}) today. Skipping.")
-                self.track_ignored_message(sender_id, sender_name, "Already forwarded today")
+            if not sender:
+                logger.warning(f"Could not get sender information (ID: {sender_id})")
                 return
             
+            # Build sender name
+            sender_name = self.build_sender_name(sender)
+            
             # Check if the message should be forwarded
             if not self.should_forward_message(message, sender, sender_name):
                 logger.info(f"Ignoring message from '{sender_name}' (ID: {sender_id}) - doesn't match criteria")
                 self.track_ignored_message(sender_id, sender_name, "Doesn't match forwarding criteria")
                 return
             
-            logger.info(f"Processing FIRST message today from '{sender_name}' (ID: {sender_id}): {message.text[:50]}...")
-            
-            # Forward message with sender info
-            success = await self.forward_message_with_info(message, sender_name, sender_id)
+            # Hold long messages until their continuation parts have arrived
+            if message_length(message.text) >= LONG_MESSAGE_THRESHOLD:
+                logger.info(f"Holding long message from '{sender_name}' (ID: {sender_id}) for continuation parts")
+                self._hold_long_message(message, sender_name, sender_id, [message.text], _now())
+                return
             
-            # Mark as forwarded only if successful
-            if success:
-                self.mark_as_forwarded(sender_id, sender_name)
-                self.track_collected_message(sender_id, sender_name)
-                logger.info(f"Marked '{sender_name}' as forwarded for today and tracked as collected")
-            else:
-                logger.warning(f"Failed to forward message from '{sender_name}' (ID: {sender_id})")
-                self.track_ignored_message(sender_id, sender_name, "Forwarding failed")
+            await self.process_first_message(message, sender_name, sender_id, message.text)
             
         except Exception as e:
             logger.error(f"Error handling message: {e}")
     
-    def build_sender_name(self, sender) -> str:
-        """Build a complete name from sender information"""
-        name_parts = []
-        
-        if hasattr(sender, 'first_name') and sender.first_name:
-            name_parts.append(sender.first_name.strip())
+    async def process_first_message(self, message, sender_name: str, sender_id: int, text: str):
+        """Forward the first message of the day from a user and record it"""
+        logger.info(f"Processing FIRST message today from '{sender_name}' (ID: {sender_id}): {text[:50]}...")
         
-        if hasattr(sender, 'last_name') and sender.last_name:
-            name_parts.append(sender.last_name.strip())
+        # Queue message with sender info for the batched sender
+        await self.forward_message_with_info(message, sender_name, sender_id, text)
         
-        if hasattr(sender, 'username') and sender.username:
-            username = f"@{sender.username}"
-            if name_parts:
-                return f"{' '.join(name_parts)} ({username})"
-            else:
-                return username
+        # Reserve today's slot right away so follow-ups are deduplicated while the forward is queued;
+        # the sender releases it again if forwarding fails
+        self.mark_as_forwarded(sender_id, sender_name)
+        self.track_collected_message(sender_id, sender_name)
+        logger.info(f"Marked '{sender_name}' as forwarded for today and tracked as collected")
+    
+    def _hold_long_message(self, message, sender_name: str, sender_id: int, parts: list, held_since: float):
+        """(Re)start the continuation window for a long message, never running past MAX_HOLD_DURATION"""
+        delay = min(CONTINUATION_WINDOW, held_since + MAX_HOLD_DURATION - _now())
+        window_task = asyncio.create_task(self._dispatch_long_message(sender_id, delay))
+        self._pending[sender_id] = (message, sender_name, parts, window_task, held_since)
+    
+    async def _dispatch_long_message(self, sender_id: int, delay: float):
+        """Forward a held long message once no more parts arrive within the continuation window"""
+        await asyncio.sleep(delay)
+        message, sender_name, parts, _, _ = self._pending.pop(sender_id)
+        try:
+            await self.process_first_message(message, sender_name, sender_id, '\n'.join(parts))
+        except Exception as e:
+            logger.error(f"Error handling long message from {sender_name}: {e}")
+    
+    def build_sender_name(self, sender) -> str:
+        """Build a complete name from sender information"""
+        first_name = (getattr(sender, 'first_name', None) or '').strip()
+        last_name = (getattr(sender, 'last_name', None) or '').strip()
+        username = getattr(sender, 'username', None)
+        name = f"{first_name} {last_name}".strip()
         
-        return ' '.join(name_parts) if name_parts else f"Unknown User"
+        if username:
+            return f"{name} (@{username})" if name else f"@{username}"
+        return name or "Unknown User"
     
     def should_forward_message(self, message, sender, sender_name: str) -> bool:
         """Determine if a message should be forwarded based on filtering criteria"""
-        # Must have text content
-        if not message.text:
-            return False
-        
         # Check if the sender's name contains a 3-4 digit number or has a first and last name
-        has_digits = bool(re.search(r'\d{3,4}', sender_name))
-        has_full_name = hasattr(sender, 'first_name') and hasattr(sender, 'last_name') and sender.first_name and sender.last_name
+        has_digits = _DIGIT_RE.search(sender_name) is not None
+        has_full_name = bool(getattr(sender, 'first_name', None) and getattr(sender, 'last_name', None))
         
         return has_digits or has_full_name
     
-    async def forward_message_with_info(self, message, sender_name: str, sender_id: int) -> bool:
-        """Forward message to bot with sender information. Returns True if successful."""
-        try:
-            if not self.bot_entity:
-                logger.error("Bot entity not available, trying to reconnect...")
-                try:
-                    self.bot_entity = await self.client.get_entity(BOT_USERNAME)
+    async def dispatch_pending_messages(self):
+        """Forward all held long messages immediately, without waiting for their continuation windows"""
+        pending, self._pending = self._pending, {}
+        for sender_id, (message, sender_name, parts, window_task, _) in pending.items():
+            window_task.cancel()
+            try:
+                await self.process_first_message(message, sender_name, sender_id, '\n'.join(parts))
+            except Exception as e:
+                logger.error(f"Error handling long message from {sender_name}: {e}")
+    
+    async def forward_message_with_info(self, message, sender_name: str, sender_id: int, text: Optional[str] = None):
+        """Queue a message for forwarding to the bot with sender information"""
+        if text is None:
+            text = message.text
+        
+        # Create a formatted message with sender info
+        formatted_message = f"📨 FIRST MESSAGE TODAY from: {sender_name}\n" \
+                          f"👤 User ID: {sender_id}\n" \
+                          f"⏰ Time: {message.date.strftime('%Y-%m-%d %H:%M:%S')}\n" \
+                          f"{'='*40}\n" \
+                          f"{text}"
+        
+        # Messages over Telegram's length limit are sent as several parts, always together
+        await self._out_queue.put((sender_id, sender_name, split_message(formatted_message)))
+    
+    async def _send_text(self, text: str):
+        """Send a single message to the bot, resolving the bot entity first if needed"""
+        while True:
+            try:
+                if not self.bot_entity:
+                    logger.error("Bot entity not available, trying to reconnect...")
+                    self.bot_entity = await self._resolve(BOT_USERNAME)
                     logger.info(f"Reconnected to bot: {self.bot_entity.username}")
-                except Exception as e:
-                    logger.error(f"Failed to reconnect to bot: {e}")
-                    return False
-            
-            # Create a formatted message with sender info
-            formatted_message = f"📨 FIRST MESSAGE TODAY from: {sender_name}\n" \
-                              f"👤 User ID: {sender_id}\n" \
-                              f"⏰ Time: {message.date.strftime('%Y-%m-%d %H:%M:%S')}\n" \
-                              f"{'='*40}\n" \
-                              f"{message.text}"
-            
-            # Send the formatted message to the specific bot
-            logger.info(f"Sending message to bot {self.bot_entity.username} (ID: {self.bot_entity.id})")
-            await self.client.send_message(self.bot_entity, formatted_message)
+                
+                await self.client.send_message(self.bot_entity, text)
+                return
+            except FloodWaitError as e:
+                # Nothing is wrong with the message; sending anything else now would only extend the wait
+                logger.warning(f"Flood wait while sending to bot, retrying in {e.seconds} seconds")
+                await asyncio.sleep(e.seconds)
+            except Exception:
+                # Try to refresh bot entity on next attempt
+                self.bot_entity = None
+                self._entity_cache.pop(BOT_USERNAME, None)
+                raise
+    
+    async def _send_forward(self, sender_id: int, sender_name: str, parts: list) -> bool:
+        """Send all parts of one forward to the bot. Returns True if successful."""
+        delivered = 0
+        try:
+            for part in parts:
+                await self._send_text(part)
+                delivered += 1
             logger.info(f"Message forwarded successfully from {sender_name} to bot {self.bot_entity.username}")
             return True
             
         except Exception as e:
             logger.error(f"Error forwarding message from {sender_name}: {e}")
-            # Try to refresh bot entity on next attempt
-            self.bot_entity = None
+            if delivered:
+                # The bot already has the start of the message; keep the daily slot so it isn't forwarded again
+                logger.warning(f"Only {delivered} of {len(parts)} parts forwarded from '{sender_name}' (ID: {sender_id})")
+            else:
+                # Release the daily slot reserved when the message was queued
+                logger.warning(f"Failed to forward message from '{sender_name}' (ID: {sender_id})")
+                self.unmark_as_forwarded(sender_id)
+                self.track_ignored_message(sender_id, sender_name, "Forwarding failed")
             return False
+    
+    async def _send_batch(self, batch: list):
+        """Send a batch of queued forwards to the bot, combining single-part forwards into one message"""
+        if len(batch) > 1:
+            sender_names = ', '.join(sender_name for _, sender_name, _ in batch)
+            try:
+                logger.info(f"Sending {len(batch)} forwards to bot in one message")
+                await self._send_text(FORWARD_SEPARATOR.join(parts[0] for _, _, parts in batch))
+                logger.info(f"Messages forwarded successfully from {sender_names} to bot {self.bot_entity.username}")
+                return
+            except Exception as e:
+                # Flood waits were already waited out and retried; for other errors fall back to one message per
+                # forward, so only the senders whose own message fails are affected
+                logger.error(f"Error forwarding batched messages from {sender_names}: {e}. Retrying one by one.")
+        
+        for sender_id, sender_name, parts in batch:
+            await self._send_forward(sender_id, sender_name, parts)
+    
+    async def _sender(self):
+        """Drain the outbound queue, packing forwards into as few bot messages as fit the length limit"""
+        loop = asyncio.get_running_loop()
+        carry_over = None
+        while True:
+            try:
+                batch = [carry_over or await self._out_queue.get()]
+                carry_over = None
+                
+                # Multi-part forwards are sent on their own; single-part ones are collected until the batch
+                # is full or the batching window closes
+                if len(batch[0][2]) == 1:
+                    length = message_length(batch[0][2][0])
+                    deadline = loop.time() + FORWARD_BATCH_DELAY
+                    while True:
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            break
+                        try:
+                            item = await asyncio.wait_for(self._out_queue.get(), timeout=remaining)
+                        except asyncio.TimeoutError:
+                            break
+                        
+                        parts = item[2]
+                        added = message_length(FORWARD_SEPARATOR) + message_length(parts[0])
+                        if len(parts) > 1 or length + added > MAX_MESSAGE_LENGTH:
+                            carry_over = item  # Starts the next batch
+                            break
+                        batch.append(item)
+                        length += added
+                
+                try:
+                    await self._send_batch(batch)
+                finally:
+                    for _ in batch:
+                        self._out_queue.task_done()
+                    
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Error in outbound sender: {e}")
 
     async def run_with_retry(self):
         """Run the userbot with retry logic"""
@@ -476,6 +883,15 @@ class UserbotForwarder:
                     break
             
             finally:
+                # Long messages still inside their continuation window aren't queued yet; forward them as they are
+                await self.dispatch_pending_messages()
+                
+                # Give queued forwards a chance to go out before disconnecting
+                try:
+                    await asyncio.wait_for(self._out_queue.join(), timeout=FORWARD_BATCH_DELAY + 10)
+                except asyncio.TimeoutError:
+                    logger.warning(f"Shutting down with {self._out_queue.qsize()} forward(s) still queued")
+                await self.flush_tracking_data()
                 if self.client and self.client.is_connected():
                     try:
                         await self.client.disconnect()
@@ -504,12 +920,16 @@ def parse_arguments():
     
     return parser.parse_args()
 
+def format_timestamp(timestamp: Optional[float]) -> str:
+    """Format a stored timestamp for display"""
+    if timestamp is None:
+        return 'Unknown time'
+    return datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
+
 def show_tracking_stats():
-    """Display tracking statistics from saved files"""
+    """Display tracking statistics from the tracking database"""
     try:
-        # Load tracking data
-        tracking_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'message_tracking.json')
-        daily_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'daily_messages.json')
+        db_file = os.path.join(_HERE, 'tracking.db')
         
         print("=== Message Tracking Statistics ===")
         
@@ -520,58 +940,67 @@ def show_tracking_stats():
         print(f"Tracking Enabled: {tracking_enabled}")
         print(f"Ignore Duration: {ignore_duration / 3600:.1f} hours ({ignore_duration} seconds)")
         
-        if tracking_enabled and os.path.exists(tracking_file):
-            with open(tracking_file, 'r') as f:
-                tracking_data = json.load(f)
-            
-            current_time = time.time()
-            cutoff_time = current_time - ignore_duration
-            
-            # Count recent entries
-            recent_ignored = sum(1 for data in tracking_data.get('ignored', {}).values() 
-                               if data.get('timestamp', 0) > cutoff_time)
-            recent_collected = sum(1 for data in tracking_data.get('collected', {}).values() 
-                                 if data.get('timestamp', 0) > cutoff_time)
-            
-            print(f"\nRecent Activity (last {ignore_duration / 3600:.1f} hours):")
-            print(f"  Ignored Messages: {recent_ignored}")
-            print(f"  Collected Messages: {recent_collected}")
-            
-            print(f"\nAll Time Totals:")
-            print(f"  Total Ignored: {len(tracking_data.get('ignored', {}))}")
-            print(f"  Total Collected: {len(tracking_data.get('collected', {}))}")
-            
-            # Show some recent ignored messages
-            if tracking_data.get('ignored'):
-                print(f"\nRecent Ignored Messages:")
-                sorted_ignored = sorted(tracking_data['ignored'].items(), 
-                                      key=lambda x: x[1].get('timestamp', 0), reverse=True)
-                for user_id, data in sorted_ignored[:5]:  # Show last 5
-                    if data.get('timestamp', 0) > cutoff_time:
-                        print(f"  {data.get('name', 'Unknown')} (ID: {user_id}) - {data.get('reason', 'No reason')} - {data.get('time_formatted', 'Unknown time')}")
+        if not os.path.exists(db_file):
+            print("==================================")
+            return
+        
+        conn = sqlite3.connect(f'file:{db_file}?mode=ro', uri=True)
+        try:
+            if tracking_enabled:
+                current_time = time.time()
+                cutoff_time = current_time - ignore_duration
+                
+                # Count recent and total entries per kind; each count is a range scan over idx_kind_ts
+                recent = {}
+                totals = {}
+                for kind in (K_IGNORED, K_COLLECTED):
+                    recent[kind] = conn.execute(
+                        'SELECT COUNT(*) FROM tracking WHERE kind = ? AND ts > ?', (kind, cutoff_time)).fetchone()[0]
+                    totals[kind] = conn.execute('SELECT COUNT(*) FROM tracking WHERE kind = ?', (kind,)).fetchone()[0]
+                
+                print(f"\nRecent Activity (last {ignore_duration / 3600:.1f} hours):")
+                print(f"  Ignored Messages: {recent.get(K_IGNORED, 0)}")
+                print(f"  Collected Messages: {recent.get(K_COLLECTED, 0)}")
+                
+                print(f"\nAll Time Totals:")
+                print(f"  Total Ignored: {totals.get(K_IGNORED, 0)}")
+                print(f"  Total Collected: {totals.get(K_COLLECTED, 0)}")
+                
+                # Show some recent ignored messages; the indexes let SQLite stop after the newest rows
+                if totals.get(K_IGNORED):
+                    print(f"\nRecent Ignored Messages:")
+                    rows = conn.execute(
+                        "SELECT user_id, name, reason, ts FROM tracking WHERE kind = ? AND ts > ? ORDER BY ts DESC LIMIT 5",
+                        (K_IGNORED, cutoff_time))
+                    for user_id, name, reason, ts in rows:
+                        print(f"  {name or 'Unknown'} (ID: {user_id}) - {reason or 'No reason'} - {format_timestamp(ts)}")
+                
+                # Show some recent collected messages
+                if totals.get(K_COLLECTED):
+                    print(f"\nRecent Collected Messages:")
+                    rows = conn.execute(
+                        "SELECT user_id, name, ts FROM tracking WHERE kind = ? AND ts > ? ORDER BY ts DESC LIMIT 5",
+                        (K_COLLECTED, cutoff_time))
+                    for user_id, name, ts in rows:
+                        print(f"  {name or 'Unknown'} (ID: {user_id}) - {format_timestamp(ts)}")
             
-            # Show some recent collected messages
-            if tracking_data.get('collected'):
-                print(f"\nRecent Collected Messages:")
-                sorted_collected = sorted(tracking_data['collected'].items(), 
-                                        key=lambda x: x[1].get('timestamp', 0), reverse=True)
-                for user_id, data in sorted_collected[:5]:  # Show last 5
-                    if data.get('timestamp', 0) > cutoff_time:
-                        print(f"  {data.get('name', 'Unknown')} (ID: {user_id}) - {data.get('time_formatted', 'Unknown time')}")
-        
-        # Show daily stats
-        if os.path.exists(daily_file):
-            with open(daily_file, 'r') as f:
-                daily_data = json.load(f)
+            # Show daily stats
+            today = date.today()
+            forwarded_today = conn.execute('SELECT COUNT(*) FROM tracking WHERE day = ?', (today.toordinal(),)).fetchone()[0]
             
             print(f"\nDaily Forwarding Stats:")
-            print(f"  Date: {daily_data.get('date', 'Unknown')}")
-            print(f"  Users Forwarded Today: {len(daily_data.get('forwarded_users', {}))}")
+            print(f"  Date: {today}")
+            print(f"  Users Forwarded Today: {forwarded_today}")
             
-            if daily_data.get('forwarded_users'):
+            if forwarded_today:
                 print(f"  Recent Forwarded Users:")
-                for user_id, data in list(daily_data['forwarded_users'].items())[:5]:  # Show last 5
-                    print(f"    {data.get('name', 'Unknown')} (ID: {user_id}) - {data.get('time', 'Unknown time')}")
+                rows = conn.execute(
+                    'SELECT user_id, name, forwarded FROM tracking WHERE day = ? ORDER BY forwarded DESC LIMIT 5',
+                    (today.toordinal(),))
+                for user_id, name, forwarded in rows:
+                    print(f"    {name or 'Unknown'} (ID: {user_id}) - {format_timestamp(forwarded)}")
+        finally:
+            conn.close()
         
         print("==================================")
         
@@ -623,6 +1052,8 @@ async def main():
     except Exception as e:
         logger.error(f"Fatal error: {e}")
         return 1
+    finally:
+        forwarder.close()
 
 if __name__ == '__main__':
     args = parse_arguments()